@@ -0,0 +1,138 @@
+"""
+alloc_profiler.py 2026-10-19 v 1.0
+
+Allocation profiler and garbage collection budget for the stream deck main loop
+
+"""
+
+import gc
+
+
+class AllocProfiler:
+    """Records the number of heap bytes allocated by each phase of the main loop and each button action
+
+    Uses the difference in gc.mem_alloc() before and after a measured section of code. Totals are
+    kept per phase name, so after the first time a phase is seen the bookkeeping itself does not
+    allocate. Measurements that span a garbage collection come out negative and are discarded.
+
+    Attributes
+    ----------
+    enabled: bool
+        when False start() and stop() do nothing so the profiler can be left in place
+    report_interval: int
+        number of loop iterations between printed reports
+    totals: dict
+        total bytes allocated keyed by phase name
+    counts: dict
+        number of measurements keyed by phase name
+    peaks: dict
+        largest single measurement keyed by phase name
+
+    Methods
+    -------
+    start()
+        marks the start of a measured section
+    stop(phase: str)
+        adds the bytes allocated since start() to the totals for phase
+    pause() -> int
+        starts a nested section and returns the bytes the enclosing section has allocated so far
+    resume(outer_allocated: int)
+        goes back to measuring the enclosing section, leaving out everything since pause()
+    tick()
+        counts a loop iteration and prints a report every report_interval iterations
+    report()
+        prints the totals, counts, and peaks for each phase
+    """
+
+    def __init__(self, enabled: bool = False, report_interval: int = 1000):
+        """Inits AllocProfiler in the disabled state by default"""
+        self.enabled = enabled
+        self.report_interval = report_interval
+        self.totals = {}
+        self.counts = {}
+        self.peaks = {}
+        self.iterations = 0
+        self._mark = 0
+
+    def start(self):
+        """Marks the start of a measured section"""
+        if self.enabled:
+            self._mark = gc.mem_alloc()
+
+    def stop(self, phase: str):
+        """
+        Adds the bytes allocated since the last start() to the totals for phase
+        Args:
+            phase: the name the measurement is recorded under
+        """
+        if not self.enabled:
+            return
+        allocated = gc.mem_alloc() - self._mark
+        if allocated < 0:
+            pass
+        elif phase in self.totals:
+            self.totals[phase] += allocated
+            self.counts[phase] += 1
+            if allocated > self.peaks[phase]:
+                self.peaks[phase] = allocated
+        else:
+            self.totals[phase] = allocated
+            self.counts[phase] = 1
+            self.peaks[phase] = allocated
+        self._mark = gc.mem_alloc()
+
+    def pause(self) -> int:
+        """
+        Starts a section nested inside another one, such as a button action inside the touch phase
+        Returns:
+            the bytes the enclosing section has allocated so far, to be passed to resume()
+        """
+        if not self.enabled:
+            return 0
+        now = gc.mem_alloc()
+        outer_allocated = now - self._mark
+        self._mark = now
+        return outer_allocated
+
+    def resume(self, outer_allocated: int):
+        """
+        Goes back to measuring the enclosing section after the nested one has been stopped.
+        Nothing allocated between pause() and resume() is counted against the enclosing section
+        Args:
+            outer_allocated: the value returned by pause()
+        """
+        if self.enabled:
+            self._mark = gc.mem_alloc() - outer_allocated
+
+    def tick(self):
+        """Counts one loop iteration and prints a report every report_interval iterations"""
+        if not self.enabled:
+            return
+        self.iterations += 1
+        if self.iterations >= self.report_interval:
+            self.report()
+            self.iterations = 0
+
+    def report(self):
+        """Prints total, per call average, and peak bytes allocated for each phase"""
+        print('Allocations by phase (total / average / peak bytes):')
+        for phase in self.totals:
+            count = self.counts[phase]
+            print(f'  {phase}: {self.totals[phase]} / {self.totals[phase]//count} / {self.peaks[phase]} over {count} calls')
+
+
+def idle_collect(threshold: int, headroom: int) -> int:
+    """
+    Runs a garbage collection if the allocated heap has grown past threshold.
+    Meant to be called when the screen is not being touched so collection
+    pauses never land in the middle of a press
+    Args:
+        threshold: the number of allocated heap bytes that triggers a collection
+        headroom: bytes of garbage allowed to build up above the live heap before the next collection
+    Returns:
+        the threshold to use for the next call
+    """
+    if gc.mem_alloc() > threshold:
+        gc.collect()
+        return gc.mem_alloc() + headroom
+    return threshold
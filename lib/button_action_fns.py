@@ -12,6 +12,9 @@ from utils import color_converter
 import requests
 import json
 
+_address_cache = {}
+_pen_cache = {}
+
 def initialize_other_vars(kwargs):
     """
     Required setup function for using the ButtonSet class with this script.
@@ -27,6 +30,37 @@ def initialize_other_vars(kwargs):
         for var_name, var_value in other_vars.items():
             globals()[var_name]=var_value
 
+def parse_address(address: str) -> tuple:
+    """
+    Converts a comma separated address string to a page, row, and column tuple.
+    Results are cached so repeated presses of the same button do not allocate
+    Args:
+        address: a comma separated string of three ints with the page, row,
+            and column of the button
+    Returns:
+        the address tuple
+    """
+    parsed = _address_cache.get(address)
+    if parsed is None:
+        parsed = tuple([int(i) for i in address.split(',')])
+        _address_cache[address] = parsed
+    return parsed
+
+def get_pen(color: str | list | tuple) -> int:
+    """
+    Returns a display pen for color, creating it only the first time a color is seen
+    Args:
+        color: a color name or a list or tuple of r, g, b values
+    Returns:
+        the pen for the Presto display
+    """
+    key = color if isinstance(color, str) else tuple(color)
+    pen = _pen_cache.get(key)
+    if pen is None:
+        pen = board_obj.display.create_pen(*color_converter(color))
+        _pen_cache[key] = pen
+    return pen
+
 def light_backlight(color: str | list | tuple | None = None) -> None:
     """Lights Presto backlight to the color given by color"""
     r,g,b = color_converter(color)
@@ -48,10 +82,10 @@ def cycle_through_colors(address):
         address: a comma separated string of three ints with the page, row,
             and column of the button
     """
-    address = tuple([int(i) for i in address.split(',')])
+    address = parse_address(address)
     this_button = ButtonSet.get_button_obj(address)
     color_cycle.append(color_cycle.pop(0))
-    this_button.outline_color = board_obj.display.create_pen(*color_converter(color_cycle[0]))
+    this_button.outline_color = get_pen(color_cycle[0])
     this_button.redraw_button()
     
 def add_amount_to_label(address,amount):
@@ -62,7 +96,7 @@ def add_amount_to_label(address,amount):
             and column of the button
         amount: a signed int of the amount to add to the label
     """
-    address = tuple([int(i) for i in address.split(',')])
+    address = parse_address(address)
     this_button = ButtonSet.get_button_obj(address)
     this_button.label = str(int(this_button.label)+amount)
     this_button.redraw_button()
@@ -75,7 +109,7 @@ def set_label(address,text):
             and column of the button
         text: the new text for the label
     """
-    address = tuple([int(i) for i in address.split(',')])
+    address = parse_address(address)
     this_button = ButtonSet.get_button_obj(address)
     this_button.label = str(text)
     this_button.redraw_button()
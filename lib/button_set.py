@@ -11,7 +11,15 @@ import button_action_fns
 from picovector import PicoVector, Polygon, HALIGN_CENTER
 from touch import Button
 from pngdec import PNG
-from utils import color_converter
+from utils import color_converter, layout_buttons, prepared_asset_key, read_asset_manifest
+try:
+    import framebuf
+except ImportError:
+    framebuf = None
+
+DRAW_PAGE = 1
+REDRAW_BUTTON = 2
+PREPARED_DIR = '/art/prepared'
 
 class ButtonSet:
     """A collection of FunctionButton objects with addresses and dynamically calculated sizes
@@ -35,6 +43,10 @@ class ButtonSet:
         indicates that the draw_page need to be called
     buttons: dict
         externally accessible copy of te ButtonSet dict
+    profiler: AllocProfiler | None
+        optional allocation profiler that records the bytes allocated by each button action
+    renderer: RenderWorker | None
+        optional render worker that draws pages and buttons off the touch polling thread
     
     Attributes
     ----------
@@ -46,6 +58,8 @@ class ButtonSet:
         The PicoGraphics class object for drawing on the screen
     background_color: str | list | tuple
         The background screen color to be displayed behind buttons
+    pages: dict
+        lists of FunctionButton objects keyed by page number, built once so touch polling does not allocate
 
     Methods
     -------
@@ -58,7 +72,9 @@ class ButtonSet:
     get_a_page(page_number: int) -> list
         returns a list of all the FunctionButton objects on page_number
     draw_page()
-        clears the screen and draws the buttons on current_page
+        clears the screen and draws the buttons on current_page, or queues it for the renderer
+    render_page()
+        clears the screen and draws the buttons on current_page immediately
 
     Class Functions
     ---------------
@@ -74,6 +90,8 @@ class ButtonSet:
     min_page = 0
     needs_redrawing = False
     buttons = {}
+    profiler = None
+    renderer = None
 
     def __init__(self,
                  buttons_defs: list[dict],
@@ -87,6 +105,7 @@ class ButtonSet:
         """Inits ButtonSet with defaults for nonessential attributes."""
 
         self.ButtonSet: dict | None = None
+        self.pages = {}
         self.board_obj = board_obj
         self.display = board_obj.display
         
@@ -99,54 +118,49 @@ class ButtonSet:
             self.background_color = background_color
         else:
             self.background_color = "black"
+        self.background_pen = self.display.create_pen(*color_converter(self.background_color))
             
         if buttons_defs:
-            buttons_seen = {}
             self.ButtonSet = {}
+            prepared_assets = read_asset_manifest(f'{PREPARED_DIR}/manifest.json',
+                                                  display_width,
+                                                  display_height,
+                                                  self.background_color)
+            layout = layout_buttons(buttons_defs,
+                                    display_width,
+                                    display_height,
+                                    margin_ratio,
+                                    corner_radius)
 
-            for item in buttons_defs:
-                address = (item['page'],item['row'],item['column'])
-                if item['page'] not in buttons_seen:
-                    buttons_seen[item['page']] = {}
-                if item['row'] not in buttons_seen[item['page']]:
-                    buttons_seen[item['page']][item['row']] = {}
-                buttons_seen[item['page']][item['row']][item['column']] = item
-                if item['page'] > ButtonSet.max_page:
-                    ButtonSet.max_page = item['page']
-                if item['page'] < ButtonSet.min_page:
-                    ButtonSet.min_page = item['page']
+            for address in layout:
+                x, y, button_width, button_height, this_page_corner_radius, this_buttons_info = layout[address]
+                if address[0] > ButtonSet.max_page:
+                    ButtonSet.max_page = address[0]
+                if address[0] < ButtonSet.min_page:
+                    ButtonSet.min_page = address[0]
+                self.ButtonSet[address] = \
+                        FunctionButton(x,
+                                       y,
+                                       button_width,
+                                       button_height,
+                                       address,
+                                       board_obj,
+                                       this_buttons_info.get('name'),
+                                       this_page_corner_radius,
+                                       this_buttons_info.get('label'),
+                                       this_buttons_info.get('label_font',default_font),
+                                       this_buttons_info.get('color',default_color),
+                                       this_buttons_info.get('outline_color'),
+                                       this_buttons_info.get('label_color'),
+                                       this_buttons_info.get('symbol'),
+                                       this_buttons_info.get('fn_name'),
+                                       this_buttons_info.get('arg'),
+                                       prepared_assets=prepared_assets)
             
-            for page in buttons_seen:
-                n = len(buttons_seen[page])
-                button_height = display_height/(n + margin_ratio*n + margin_ratio)
-                gap = button_height * margin_ratio
-                if not corner_radius:
-                    this_page_corner_radius = gap
-                else:
-                    this_page_corner_radius = corner_radius
-                for row in buttons_seen[page]:
-                    m = len(buttons_seen[page][row])
-                    button_width = (display_width - (m+1)*gap)/m
-                    for column in buttons_seen[page][row]:
-                        address = (page,row,column)
-                        this_buttons_info = buttons_seen[page][row][column]
-                        self.ButtonSet[address] = \
-                                FunctionButton(gap*(column+1)+column*button_width,
-                                               gap*(row+1)+row*button_height,
-                                               button_width,
-                                               button_height,
-                                               address,
-                                               board_obj,
-                                               this_buttons_info.get('name'),
-                                               this_page_corner_radius,
-                                               this_buttons_info.get('label'),
-                                               this_buttons_info.get('label_font',default_font),
-                                               this_buttons_info.get('color',default_color),
-                                               this_buttons_info.get('outline_color'),
-                                               this_buttons_info.get('label_color'),
-                                               this_buttons_info.get('symbol'),
-                                               this_buttons_info.get('fn_name'),
-                                               this_buttons_info.get('arg'))
+            for address in self.ButtonSet:
+                if address[0] not in self.pages:
+                    self.pages[address[0]] = []
+                self.pages[address[0]].append(self.ButtonSet[address])
         ButtonSet.buttons = self.ButtonSet
         button_action_fns.initialize_other_vars(kwargs)
         
@@ -159,9 +173,13 @@ class ButtonSet:
         Returns:
              address tuple with page, row, and column of the button pressed
         """
-        for button in self.get_current_page():
-            if button.just_pressed():
-                return button.address
+        self.board_obj.touch.poll()
+        page = self.get_current_page()
+        i = 0
+        while i < len(page):
+            if page[i].update_pressed():
+                return page[i].address
+            i += 1
         return None
 
     def run_addressed_button(self, address:tuple):
@@ -174,13 +192,7 @@ class ButtonSet:
         """
         button = self.ButtonSet.get(address)
         if button.fn:
-            if button.arg is not None:
-                if list is type(button.arg):
-                    return button.fn(*button.arg)
-                else:
-                    return button.fn(button.arg)
-            else:
-                return button.fn()
+            return self._run_button(button)
 
     def touch_to_action(self) -> None:
         """
@@ -190,15 +202,32 @@ class ButtonSet:
         Returns:
             whatever the triggered function returns
         """
-        for button in self.get_current_page():
-            if button.just_pressed() and button.fn:
-                if button.arg is not None:
-                    if list is type(button.arg):
-                        return button.fn(*button.arg)
-                    else:
-                        return button.fn(button.arg)
-                else:
-                    return button.fn()
+        # Indexed loop so polling never creates an iterator object
+        self.board_obj.touch.poll()
+        page = self.get_current_page()
+        i = 0
+        while i < len(page):
+            button = page[i]
+            if button.update_pressed() and button.fn:
+                return self._run_button(button)
+            i += 1
+
+    def _run_button(self, button):
+        """Calls the function of button with its arguments, recording its allocations if profiling"""
+        profiler = ButtonSet.profiler
+        if profiler is not None:
+            outer_allocated = profiler.pause()
+        if button.arg is not None:
+            if list is type(button.arg):
+                result = button.fn(*button.arg)
+            else:
+                result = button.fn(button.arg)
+        else:
+            result = button.fn()
+        if profiler is not None:
+            profiler.stop(button.fn_name)
+            profiler.resume(outer_allocated)
+        return result
 
     def get_a_page(self,page_number: int) -> list:
         """
@@ -208,22 +237,15 @@ class ButtonSet:
         Returns:
             a list of FunctionButton objects
         """
-        return_list = []
-        for button in self.ButtonSet:
-            if button[0] == page_number:
-                return_list.append(self.ButtonSet[button])
-        return return_list
+        return list(self.pages.get(page_number, ()))
 
-    def get_current_page(self) -> list:
+    def get_current_page(self) -> list | tuple:
         """
-        Returns a list of FunctionButton objects that are all the button on the current page
+        Returns the cached list of FunctionButton objects that are all the button on the current page.
+        The list is shared and must not be modified by the caller
             Returns: a list of FunctionButton objects
         """
-        return_list = []
-        for button in self.ButtonSet:
-            if button[0] == ButtonSet.current_page:
-                return_list.append(self.ButtonSet[button])
-        return return_list
+        return self.pages.get(ButtonSet.current_page, ())
 
     def get_button_obj(address):
         """
@@ -237,10 +259,16 @@ class ButtonSet:
 
     def draw_page(self):
         """Draws a page of FunctionButton objects after a page change"""
-        self.display.set_pen(self.display.create_pen(*color_converter(self.background_color)))
+        if ButtonSet.renderer is not None:
+            ButtonSet.renderer.submit(DRAW_PAGE, self)
+        else:
+            self.render_page()
+
+    def render_page(self):
+        """Clears the screen and draws the current page of FunctionButton objects on this thread"""
+        self.display.set_pen(self.background_pen)
         self.display.clear()
-        current_page = self.get_current_page()
-        for button in current_page:
+        for button in self.get_current_page():
             button.draw_button()
         self.board_obj.update()
     
@@ -307,6 +335,8 @@ class FunctionButton(Button):
         color to be used for the label, overrides color
     symbol: str
         name of a png file with symbol to be displayed
+    prepared_assets: dict
+        manifest entries for symbols pre-scaled to raw pixels by tools/build_assets.py
     fn_name: str
         name of the function to be called when the button is pressed
     arg: str | list | dict | int | float
@@ -317,12 +347,25 @@ class FunctionButton(Button):
     draw_button()
         draws button elements to be ready for a screen update
     redraw_button()
-        draws button elements and calls a partial screen update around the button
+        draws button elements and calls a partial screen update around the button, or queues it for the renderer
+    render_button()
+        draws button elements and calls a partial screen update around the button immediately
     just_pressed()
         returns true once on the first calling after a button is touched
     just_released()
         returns true once on the first calling after a button is released
+    update_pressed()
+        same as just_pressed() but uses the last touch poll instead of polling again
+    invalidate_layout()
+        recalculates cached sizes and positions after x, y, width, height, radius, or label_font change
+    load_prepared_symbol(prepared_assets: dict | None = None) -> bool
+        loads a pre-scaled raw pixel symbol for this button's symbol_path if one exists
     """
+    vector = None
+    png = None
+    screen = None
+    current_font = None
+    current_font_size = None
 
     def __init__(self,
                  x: int,
@@ -341,6 +384,7 @@ class FunctionButton(Button):
                  symbol: str | None = None,
                  fn_name: str | None = None,
                  arg: str | list | dict | int | float | None = None,
+                 prepared_assets: dict | None = None,
                  **kwargs):
         """ Inits a FunctionButton object withe defaults for nonessential values."""
         super().__init__(x, y, width, height)
@@ -360,6 +404,23 @@ class FunctionButton(Button):
         self.label = label
         self.depressed = False
         
+        if FunctionButton.vector is None:
+            FunctionButton.vector = PicoVector(self.display)
+            FunctionButton.png = PNG(self.display)
+            display_width, display_height = self.display.get_bounds()
+            try:
+                screen_buffer = memoryview(self.display)
+                if framebuf and len(screen_buffer) == display_width*display_height*2:
+                    FunctionButton.screen = framebuf.FrameBuffer(screen_buffer,
+                                                                 display_width,
+                                                                 display_height,
+                                                                 framebuf.RGB565)
+            except TypeError:
+                pass
+
+        self.invalidate_layout()
+        self.redraw_pending = False
+        
         try:
             open(f'/art/{label_font}')
             self.label_font = f'/art/{label_font}'
@@ -382,6 +443,9 @@ class FunctionButton(Button):
             self.symbol_path = f'/art/{symbol}'
         else:
             self.symbol_path = None
+        self.symbol = symbol
+        self.prepared_assets = prepared_assets or {}
+        self.load_prepared_symbol()
 
         if fn_name:
             try:
@@ -396,69 +460,181 @@ class FunctionButton(Button):
         else:
             self.fn = None
 
+    def load_prepared_symbol(self, prepared_assets: dict | None = None) -> bool:
+        """
+        Loads a raw pixel version of the symbol in symbol_path pre-scaled to the button size,
+        so drawing it is a single frame buffer blit with no file access. draw_button calls
+        this again when symbol_path no longer matches the loaded symbol
+        Args:
+            prepared_assets: the assets dict from the prepared asset manifest,
+                defaults to the one the button was created with
+        Returns:
+            True if the prepared symbol will be used instead of the png
+        """
+        if prepared_assets is not None:
+            self.prepared_assets = prepared_assets
+        self.symbol_image = None
+        self.symbol_pixels = None
+        self.prepared_symbol_path = self.symbol_path
+        if not self.symbol_path or not self.prepared_assets:
+            return False
+        if self.symbol_path.startswith('/art/'):
+            self.symbol = self.symbol_path[len('/art/'):]
+        else:
+            self.symbol = self.symbol_path
+        entry = self.prepared_assets.get(prepared_asset_key(self.symbol, self.width, self.height))
+        if not entry or FunctionButton.screen is None:
+            return False
+        symbol_width = entry['width']
+        symbol_height = entry['height']
+        symbol_x = self.center_x - symbol_width//2
+        symbol_y = self.center_y - symbol_height//2
+        display_width, display_height = self.display.get_bounds()
+        if symbol_x < 0 or symbol_y < 0 or symbol_x+symbol_width > display_width or symbol_y+symbol_height > display_height:
+            return False
+        symbol_file = f'{PREPARED_DIR}/{entry["file"]}'
+        pixels = bytearray(symbol_width*symbol_height*2)
+        try:
+            with open(symbol_file, 'rb') as file:
+                if file.readinto(pixels) != len(pixels):
+                    raise ValueError(f'expected {len(pixels)} bytes of pixels')
+        except Exception as exc:
+            print(f"Could not read prepared image file {symbol_file} for button {self.name}. Using png.")
+            print(exc)
+            return False
+        self.symbol_image = framebuf.FrameBuffer(pixels, symbol_width, symbol_height, framebuf.RGB565)
+        self.symbol_pixels = pixels
+        self.symbol_x = symbol_x
+        self.symbol_y = symbol_y
+        self.symbol_key = entry['key']
+        return True
+
+    def invalidate_layout(self):
+        """
+        Recalculates the outline, update area, and center of the button and clears the
+        cached label layout and prepared symbol. Call this after changing x, y, width,
+        height, radius, or label_font on a live button, before redrawing it
+        """
+        self.shape = Polygon()
+        self.shape.rectangle(self.x,
+                             self.y,
+                             self.width,
+                             self.height,
+                             corners=(self.radius, self.radius, self.radius, self.radius),
+                             stroke=3)
+        self.update_x = int(self.x)-1
+        self.update_y = int(self.y)-1
+        self.update_width = int(self.width)+2
+        self.update_height = int(self.height)+2
+        self.center_x = int(self.x+0.5*self.width)
+        self.center_y = int(self.y+0.5*self.height)
+        self.layout_label = None
+        self.layout = None
+        self.symbol_image = None
+        self.prepared_symbol_path = None
+
+    def layout_label_text(self, label: str):
+        """Calculates the font size and position of label so that redraws can reuse them"""
+        vector = FunctionButton.vector
+        if self.label_font:
+            vector.set_font(self.label_font, int(0.33*self.height))
+            vector.set_font_align(HALIGN_CENTER)
+            font_size = int(0.33*self.height)
+            text_x, text_y, text_width, text_height = vector.measure_text(label)
+            if text_height > 0.9*self.height:
+                font_size = int(0.85*self.height/text_height*0.33*self.height)
+                vector.set_font_size(font_size)
+                text_x, text_y, text_width, text_height = vector.measure_text(label)
+            if text_width > 0.9*self.width:
+                font_size = int(0.85*self.width/text_width*0.33*self.height)
+                vector.set_font_size(font_size)
+                text_x, text_y, text_width, text_height = vector.measure_text(label)
+            FunctionButton.current_font = self.label_font
+            FunctionButton.current_font_size = font_size
+            first_line = label.split('\n')[0]
+            first_line_x, first_line_y, first_line_width, first_line_height = vector.measure_text(first_line)
+            last_line = label.split('\n')[-1]
+            last_line_x, last_line_y, last_line_width, last_line_height = vector.measure_text(last_line)
+            text_y_offset = int(0.5*text_height - first_line_height - last_line_y)
+            self.layout = (font_size,
+                           int(self.x+0.5*self.width-0.52*text_width),
+                           int(self.y+0.5*self.height-text_y_offset),
+                           int(1.04*text_width))
+        else:
+            self.layout = (None,
+                           int(self.x+5),
+                           int(self.y+0.5*self.height-5),
+                           int(self.width-10))
+        self.layout_label = label
+
     def draw_button(self):
         """Draws the elements of a Function button with correctly scaled symbol and text"""
-        vector = PicoVector(self.display)
+        vector = FunctionButton.vector
         self.display.set_pen(self.outline_color)
-        shape = Polygon()
-        shape.rectangle(self.x, 
-                        self.y,
-                        self.width, 
-                        self.height, 
-                        corners=(self.radius, self.radius, self.radius, self.radius), 
-                        stroke=3)
-        vector.draw(shape)
+        vector.draw(self.shape)
         
-        if self.symbol_path:
-            png = PNG(self.display)
+        if self.symbol_path != self.prepared_symbol_path:
+            self.load_prepared_symbol()
+        if self.symbol_image is not None:
+            FunctionButton.screen.blit(self.symbol_image, self.symbol_x, self.symbol_y, self.symbol_key)
+        elif self.symbol_path:
+            png = FunctionButton.png
             try:
                 png.open_file(self.symbol_path)
-                png.decode(int(self.x+0.5*self.width-0.5*png.get_width()), int(self.y+0.5*self.height-0.5*png.get_height()))
+                png.decode(self.center_x-png.get_width()//2, self.center_y-png.get_height()//2)
             except Exception as exc:
                 print(f"No image file called {self.symbol_path} found for button {self.name}.")
                 print(exc)
             
-        if self.label:
+        label = self.label
+        if label:
+            if label is not self.layout_label:
+                self.layout_label_text(label)
+            font_size, text_x, text_y, text_width = self.layout
             self.display.set_pen(self.label_color)
             if self.label_font:
-                vector.set_font(self.label_font, int(0.33*self.height))
-                vector.set_font_align(HALIGN_CENTER)
-                text_x, text_y, text_width, text_height = vector.measure_text(self.label)
-                if text_height > 0.9*self.height:
-                    vector.set_font(self.label_font, int(0.85*self.height/text_height*0.33*self.height))
-                    text_x, text_y, text_width, text_height = vector.measure_text(self.label)
-                text_x, text_y, text_width, text_height = vector.measure_text(self.label)
-                if text_width > 0.9*self.width:
-                    vector.set_font(self.label_font, int(0.85*self.width/text_width*0.33*self.height))
-                    text_x, text_y, text_width, text_height = vector.measure_text(self.label)
-                first_line = self.label.split('\n')[0]
-                first_line_x, first_line_y, first_line_width, first_line_height = vector.measure_text(first_line)
-                last_line = self.label.split('\n')[-1]
-                last_line_x, last_line_y, last_line_width, last_line_height = vector.measure_text(last_line)
-                text_y_offset = int(0.5*text_height - first_line_height - last_line_y)
-                vector.text(self.label, 
-                            int(self.x+0.5*self.width-0.52*text_width),
-                            int(self.y+0.5*self.height-text_y_offset),
-                            0,
-                            int(1.04*text_width))
+                if FunctionButton.current_font != self.label_font:
+                    vector.set_font(self.label_font, font_size)
+                    vector.set_font_align(HALIGN_CENTER)
+                    FunctionButton.current_font = self.label_font
+                    FunctionButton.current_font_size = font_size
+                elif FunctionButton.current_font_size != font_size:
+                    vector.set_font_size(font_size)
+                    FunctionButton.current_font_size = font_size
+                vector.text(label, text_x, text_y, 0, text_width)
             else:
-                self.board_obj.display.text(self.label,
-                                            int(self.x+5),
-                                            int(self.y+0.5*self.height-5),
-                                            int(self.width-10),
-                                            3)
+                self.board_obj.display.text(label, text_x, text_y, text_width, 3)
 
     def redraw_button(self):
         """Redraws a single button after some aspect of its appearance has been updated"""
+        if ButtonSet.renderer is not None:
+            if not self.redraw_pending:
+                self.redraw_pending = True
+                ButtonSet.renderer.submit(REDRAW_BUTTON, self)
+        else:
+            self.render_button()
+
+    def render_button(self):
+        """Draws a single button and updates the screen around it on this thread if it is on the current page"""
+        self.redraw_pending = False
+        if self.address[0] != ButtonSet.current_page:
+            return
         self.draw_button()
-        self.board_obj.partial_update(int(self.x)-1,
-                                      int(self.y)-1,
-                                      int(self.width)+2,
-                                      int(self.height)+2)
+        self.board_obj.partial_update(self.update_x,
+                                      self.update_y,
+                                      self.update_width,
+                                      self.update_height)
 
     def just_pressed(self):
         """Returns True once and only once when a button transitions from not touched to touched"""
         self.touch.poll()
+        return self.update_pressed()
+
+    def update_pressed(self):
+        """
+        Returns True once and only once when a button transitions from not touched to touched
+        using the touch state from the last poll, so a page of buttons only polls once
+        """
         if self.is_pressed():
             if not self.depressed:
                 self.depressed = True
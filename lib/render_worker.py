@@ -0,0 +1,141 @@
+"""
+render_worker.py 2026-10-19 v 1.0
+
+Render worker that moves drawing off the touch polling thread
+
+"""
+
+import _thread
+import time
+from button_set import DRAW_PAGE, REDRAW_BUTTON
+
+
+class RenderWorker:
+    """Draws pages and buttons on a second thread from a bounded queue of draw commands
+
+    On the Presto the thread started by _thread runs on the second core of the RP2350, so
+    slow page draws and PNG decodes no longer block touch polling on the first core. On
+    Linux the same code runs as an ordinary thread, which is useful for testing.
+
+    The queue is a fixed size ring buffer with a single producer, the main loop, and a
+    single consumer, the worker. The producer only ever moves tail and the consumer only
+    ever moves head, so no lock is needed. Each command is a frame: the worker finishes
+    drawing and pushes it to the screen with update() or partial_update() before it starts
+    the next one, so a button is never shown half drawn.
+
+    Attributes
+    ----------
+    capacity: int
+        number of commands the queue holds. One slot is always left empty
+    frames_submitted: int
+        number of commands added to the queue
+    frames_drawn: int
+        number of commands the worker has finished
+    running: bool
+        True while the worker thread is running. Cleared when the thread exits for any reason
+    stopping: bool
+        True once stop() has been called
+
+    Methods
+    -------
+    start()
+        starts the worker thread
+    stop()
+        asks the worker thread to exit after the queue is empty
+    submit(op: int, target)
+        adds a draw command to the queue, waiting if the queue is full, or draws it
+        on the calling thread if the worker is not running
+    fence(timeout_ms: int | None = None) -> bool
+        waits until every submitted command has been drawn
+    """
+
+    def __init__(self, capacity: int = 16):
+        """Inits RenderWorker with an empty queue"""
+        self.capacity = capacity
+        self.ops = [0] * capacity
+        self.targets = [None] * capacity
+        self.head = 0
+        self.tail = 0
+        self.frames_submitted = 0
+        self.frames_drawn = 0
+        self.running = False
+        self.stopping = False
+
+    def start(self):
+        """Starts the worker thread"""
+        self.stopping = False
+        self.running = True
+        _thread.start_new_thread(self._run, ())
+
+    def stop(self):
+        """Asks the worker thread to exit once it has drawn everything in the queue"""
+        self.stopping = True
+
+    def submit(self, op: int, target):
+        """
+        Adds a draw command to the queue, waiting for the worker if the queue is full.
+        If the worker was never started, has been stopped, or has died, the command is
+        drawn on the calling thread instead so the caller never waits forever
+        Args:
+            op: DRAW_PAGE or REDRAW_BUTTON
+            target: the ButtonSet for DRAW_PAGE or the FunctionButton for REDRAW_BUTTON
+        """
+        if self.running and not self.stopping:
+            tail = self.tail
+            next_tail = (tail + 1) % self.capacity
+            while next_tail == self.head and self.running:
+                time.sleep(0.001)
+            if self.running:
+                self.ops[tail] = op
+                self.targets[tail] = target
+                self.frames_submitted += 1
+                self.tail = next_tail
+                return
+        while self.running:
+            time.sleep(0.001)
+        self._draw(op, target)
+
+    def fence(self, timeout_ms: int | None = None) -> bool:
+        """
+        Waits until the worker has drawn every command submitted so far
+        Args:
+            timeout_ms: the longest time to wait, or None to wait as long as the worker is running
+        Returns:
+            True if everything submitted has been drawn
+        """
+        frame = self.frames_submitted
+        waited_ms = 0
+        while self.frames_drawn < frame and self.running:
+            if timeout_ms is not None and waited_ms >= timeout_ms:
+                break
+            time.sleep(0.001)
+            waited_ms += 1
+        return self.frames_drawn >= frame
+
+    def _draw(self, op: int, target):
+        """Draws one command, printing rather than raising any error"""
+        try:
+            if op == DRAW_PAGE:
+                target.render_page()
+            elif op == REDRAW_BUTTON:
+                target.render_button()
+        except Exception as exc:
+            print(f'Render worker failed to draw {target}.')
+            print(exc)
+
+    def _run(self):
+        """Worker thread loop that draws each queued command in order"""
+        try:
+            while not self.stopping or self.head != self.tail:
+                head = self.head
+                if head == self.tail:
+                    time.sleep(0.001)
+                    continue
+                op = self.ops[head]
+                target = self.targets[head]
+                self.targets[head] = None
+                self._draw(op, target)
+                self.head = (head + 1) % self.capacity
+                self.frames_drawn += 1
+        finally:
+            self.running = False
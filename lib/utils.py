@@ -62,3 +62,63 @@ def read_input_file(json_file):
         corner_radius = init_data.pop("corner_radius",None)
         other_vars = init_data
         return buttons_defs, margin_ratio, default_color, background_color, default_font, corner_radius, other_vars
+
+def layout_buttons(buttons_defs, display_width, display_height, margin_ratio=0.1, corner_radius=None):
+    """Calculates the position, size, and corner radius of every button in buttons_defs.
+        Each page is split into rows of equal height and each row into columns of equal
+        width, with gaps of margin_ratio times the button height around and between them.
+        Returns a dict keyed by the page, row, column address tuple with values of
+        (x, y, width, height, corner_radius, button definition)"""
+    buttons_seen = {}
+    for item in buttons_defs:
+        if item['page'] not in buttons_seen:
+            buttons_seen[item['page']] = {}
+        if item['row'] not in buttons_seen[item['page']]:
+            buttons_seen[item['page']][item['row']] = {}
+        buttons_seen[item['page']][item['row']][item['column']] = item
+
+    layout = {}
+    for page in buttons_seen:
+        n = len(buttons_seen[page])
+        button_height = display_height/(n + margin_ratio*n + margin_ratio)
+        gap = button_height * margin_ratio
+        if not corner_radius:
+            this_page_corner_radius = gap
+        else:
+            this_page_corner_radius = corner_radius
+        for row in buttons_seen[page]:
+            m = len(buttons_seen[page][row])
+            button_width = (display_width - (m+1)*gap)/m
+            for column in buttons_seen[page][row]:
+                layout[(page,row,column)] = (gap*(column+1)+column*button_width,
+                                             gap*(row+1)+row*button_height,
+                                             button_width,
+                                             button_height,
+                                             this_page_corner_radius,
+                                             buttons_seen[page][row][column])
+    return layout
+
+def prepared_asset_key(symbol, width, height):
+    """Returns the manifest key for a symbol pre-scaled for a button of width by height"""
+    return f'{symbol}@{round(width)}x{round(height)}'
+
+def read_asset_manifest(manifest_file, display_width=None, display_height=None, background_color=None):
+    """Reads the manifest of prepared raw pixel symbols written by tools/build_assets.py.
+        Returns an empty dict if no assets have been prepared, or if they were built
+        for a different display size or background color than the ones given"""
+    try:
+        with open(manifest_file,'r') as file:
+            manifest = json.load(file)
+    except OSError:
+        return {}
+    except ValueError as exc:
+        print(f'Could not read {manifest_file}. Using png symbols.')
+        print(exc)
+        return {}
+    if display_width is not None and manifest.get('display') != [display_width, display_height]:
+        print(f'{manifest_file} was built for a {manifest.get("display")} display, not {display_width}x{display_height}. Using png symbols.')
+        return {}
+    if background_color is not None and manifest.get('background_color') != list(color_converter(background_color)):
+        print(f'{manifest_file} was built for background color {manifest.get("background_color")}, not {background_color}. Using png symbols.')
+        return {}
+    return manifest.get('assets',{})
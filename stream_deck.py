@@ -13,7 +13,9 @@ Main script for stream deck app
 from presto import Presto
 from button_set import ButtonSet
 from utils import show_message, read_input_file
+from alloc_profiler import AllocProfiler, idle_collect
 import ezwifi
+import gc
 
 board_obj = Presto(full_res=True)
 
@@ -24,6 +26,11 @@ ezwifi.connect(verbose=True)
 buttons_defs, margin_ratio, default_color, background_color, \
     default_font, corner_radius, other_vars = read_input_file('button_defs.json')
 
+gc_headroom = other_vars.pop('gc_headroom', 65536)
+profiler = AllocProfiler(other_vars.pop('profile_allocations', False),
+                         other_vars.pop('profile_report_interval', 1000))
+use_render_worker = other_vars.pop('render_worker', False)
+
 buttons = ButtonSet(buttons_defs,
                     board_obj,
                     margin_ratio,
@@ -33,11 +40,32 @@ buttons = ButtonSet(buttons_defs,
                     corner_radius,
                     other_vars=other_vars)
 
+ButtonSet.profiler = profiler
+
+if use_render_worker:
+    from render_worker import RenderWorker
+    if profiler.enabled:
+        print('Allocation profiling is turned off while the render worker is running.')
+        profiler.enabled = False
+    ButtonSet.renderer = RenderWorker()
+    ButtonSet.renderer.start()
+
 buttons.draw_page()
+if ButtonSet.renderer is not None:
+    ButtonSet.renderer.fence()
+
+gc.collect()
+gc_threshold = gc.mem_alloc() + gc_headroom
 
 while True:
+    profiler.start()
     action_result = buttons.touch_to_action()
+    profiler.stop('touch')
     
     if ButtonSet.needs_redrawing:
         buttons.draw_page()
         ButtonSet.needs_redrawing = False
+        profiler.stop('draw_page')
+    elif not board_obj.touch.state:
+        gc_threshold = idle_collect(gc_threshold, gc_headroom)
+    profiler.tick()
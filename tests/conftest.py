@@ -0,0 +1,214 @@
+"""
+Stand-ins for the Presto firmware modules so the lib scripts can run under CPython
+"""
+
+import itertools
+import os
+import sys
+import tracemalloc
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+
+class StubDisplay:
+    def __init__(self, width=480, height=480):
+        self.width = width
+        self.height = height
+        self.calls = []
+
+    def get_bounds(self):
+        return self.width, self.height
+
+    def create_pen(self, r, g, b):
+        return (r << 16) | (g << 8) | b
+
+    def set_pen(self, pen):
+        pass
+
+    def clear(self):
+        self.calls.append('clear')
+
+    def text(self, text, x, y, wrap, scale):
+        pass
+
+
+class StubTouch:
+    def __init__(self):
+        self.state = False
+        self.x = 0
+        self.y = 0
+
+    def poll(self):
+        pass
+
+
+class StubPresto:
+    def __init__(self, full_res=False):
+        self.display = StubDisplay()
+        self.touch = StubTouch()
+        self.updates = []
+        self.record_updates = True
+
+    def update(self):
+        if self.record_updates:
+            self.updates.append('update')
+
+    def partial_update(self, x, y, width, height):
+        if self.record_updates:
+            self.updates.append(('partial_update', x, y, width, height))
+
+    def set_led_rgb(self, i, r, g, b):
+        pass
+
+
+class StubButton:
+    def __init__(self, x, y, w, h):
+        self.bounds = (x, y, w, h)
+
+    def is_pressed(self):
+        x, y, w, h = self.bounds
+        return self.touch.state and x <= self.touch.x < x + w and y <= self.touch.y < y + h
+
+
+class StubVector:
+    def __init__(self, display):
+        pass
+
+    def set_font(self, font, size):
+        pass
+
+    def set_font_size(self, size):
+        pass
+
+    def set_font_align(self, align):
+        pass
+
+    def measure_text(self, text):
+        return 0, 0, 10*len(text), 30
+
+    def text(self, text, x, y, angle, max_width):
+        pass
+
+    def draw(self, shape):
+        pass
+
+
+class StubPolygon:
+    def rectangle(self, x, y, w, h, corners=None, stroke=None):
+        pass
+
+
+class StubPNG:
+    def __init__(self, display):
+        pass
+
+    def open_file(self, path):
+        pass
+
+    def decode(self, x, y):
+        pass
+
+    def get_width(self):
+        return 90
+
+    def get_height(self):
+        return 90
+
+
+class StubFrameBuffer:
+    """RGB565 frame buffer with a pure Python blit that skips pixels equal to key"""
+
+    def __init__(self, buffer, width, height, format):
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+
+    def blit(self, source, x, y, key=-1):
+        for row in range(source.height):
+            for column in range(source.width):
+                i = 2*(row*source.width + column)
+                if source.buffer[i] | (source.buffer[i+1] << 8) != key:
+                    j = 2*((y+row)*self.width + x + column)
+                    self.buffer[j:j+2] = source.buffer[i:i+2]
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+
+
+_module('presto', Presto=StubPresto, Buzzer=lambda pin: types.SimpleNamespace(set_tone=lambda tone: None))
+_module('touch', Button=StubButton)
+_module('picovector', PicoVector=StubVector, Polygon=StubPolygon, HALIGN_CENTER=0)
+_module('pngdec', PNG=StubPNG)
+_module('requests', post=None, get=None)
+_module('framebuf', FrameBuffer=StubFrameBuffer, RGB565=1)
+
+
+def bytes_allocated(fn, iterations):
+    """
+    Runs fn iterations times and returns the largest number of bytes in use at once
+    beyond what was in use before. Unlike a snapshot comparison this also catches
+    objects that are created and freed again within a call. The warm up calls let
+    CPython finish specializing the bytecode, which allocates on its own
+    """
+    for _ in range(20):
+        fn()
+    tracemalloc.start()
+    try:
+        fn()
+        calls = itertools.repeat(None, iterations)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in calls:
+            fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+@pytest.fixture
+def board():
+    return StubPresto(full_res=True)
+
+
+@pytest.fixture
+def make_buttons(board):
+    from button_set import ButtonSet, FunctionButton
+    from utils import read_input_file
+
+    ButtonSet.current_page = 0
+    ButtonSet.max_page = 0
+    ButtonSet.min_page = 0
+    ButtonSet.needs_redrawing = False
+    ButtonSet.profiler = None
+    ButtonSet.renderer = None
+    FunctionButton.vector = None
+    FunctionButton.screen = None
+
+    def make_buttons():
+        buttons_defs, margin_ratio, default_color, background_color, \
+            default_font, corner_radius, other_vars = read_input_file(os.path.join(ROOT, 'button_defs.json'))
+        return ButtonSet(buttons_defs,
+                         board,
+                         margin_ratio,
+                         default_color,
+                         background_color,
+                         default_font,
+                         corner_radius,
+                         other_vars=other_vars)
+
+    yield make_buttons
+    FunctionButton.screen = None
+
+
+@pytest.fixture
+def buttons(make_buttons):
+    return make_buttons()
@@ -0,0 +1,89 @@
+"""
+Checks that the steady state touch loop and label redraws do not allocate
+"""
+
+import alloc_profiler
+from button_set import ButtonSet, FunctionButton
+from conftest import StubVector, bytes_allocated
+
+
+def test_idle_touch_loop_does_not_allocate(buttons, board):
+    board.touch.state = False
+    assert bytes_allocated(buttons.touch_to_action, 1000) == 0
+
+
+def test_held_touch_does_not_allocate(buttons, board):
+    board.touch.state = True
+    board.touch.x, board.touch.y = 50, 50
+    buttons.touch_to_action()
+    assert bytes_allocated(buttons.touch_to_action, 1000) == 0
+
+
+def test_redraw_label_button_does_not_allocate(buttons, board):
+    board.record_updates = False
+    button = ButtonSet.get_button_obj((0, 0, 0))
+    assert button.label and not button.symbol_path
+    assert bytes_allocated(button.redraw_button, 100) == 0
+
+
+def test_redraw_label_button_with_font_does_not_allocate(buttons, board):
+    board.record_updates = False
+    button = ButtonSet.get_button_obj((0, 0, 0))
+    button.label_font = '/art/OpenSans-Regular.af'
+    button.invalidate_layout()
+    assert bytes_allocated(button.redraw_button, 100) == 0
+
+
+class RecordingVector(StubVector):
+    def __init__(self, display):
+        self.fonts = []
+        self.texts = []
+
+    def set_font(self, font, size):
+        self.fonts.append(font)
+
+    def text(self, text, x, y, angle, max_width):
+        self.texts.append((text, x, y))
+
+
+def test_invalidate_layout_picks_up_new_font_and_geometry(buttons, monkeypatch):
+    vector = RecordingVector(None)
+    monkeypatch.setattr(FunctionButton, 'vector', vector)
+    button = ButtonSet.get_button_obj((0, 0, 0))
+    button.redraw_button()
+    assert vector.fonts == []
+
+    button.label_font = '/art/OpenSans-Regular.af'
+    button.x += 20
+    button.invalidate_layout()
+    button.redraw_button()
+
+    assert vector.fonts[-1] == '/art/OpenSans-Regular.af'
+    assert vector.texts[-1][0] == button.label
+    assert button.center_x == int(button.x+0.5*button.width)
+    assert button.update_x == int(button.x)-1
+
+
+class FakeGC:
+    def __init__(self):
+        self.allocated = 0
+
+    def mem_alloc(self):
+        return self.allocated
+
+
+def test_profiler_keeps_nested_action_out_of_enclosing_phase(monkeypatch):
+    fake_gc = FakeGC()
+    monkeypatch.setattr(alloc_profiler, 'gc', fake_gc)
+    profiler = alloc_profiler.AllocProfiler(enabled=True)
+
+    profiler.start()
+    fake_gc.allocated += 16
+    outer_allocated = profiler.pause()
+    fake_gc.allocated += 200
+    profiler.stop('action')
+    profiler.resume(outer_allocated)
+    fake_gc.allocated += 8
+    profiler.stop('touch')
+
+    assert profiler.totals == {'action': 200, 'touch': 24}
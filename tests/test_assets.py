@@ -0,0 +1,215 @@
+"""
+Checks the shared button layout, the asset build step, and drawing prepared symbols
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import button_set
+import build_assets
+from button_set import ButtonSet, FunctionButton
+from conftest import ROOT, StubFrameBuffer, bytes_allocated
+from utils import layout_buttons, prepared_asset_key, read_asset_manifest, read_input_file
+
+BUTTON_DEFS = os.path.join(ROOT, 'button_defs.json')
+
+
+def inline_layout(buttons_defs, display_width, display_height, margin_ratio, corner_radius):
+    """The layout code ButtonSet.__init__ ran before it was moved into utils.layout_buttons"""
+    buttons_seen = {}
+    for item in buttons_defs:
+        if item['page'] not in buttons_seen:
+            buttons_seen[item['page']] = {}
+        if item['row'] not in buttons_seen[item['page']]:
+            buttons_seen[item['page']][item['row']] = {}
+        buttons_seen[item['page']][item['row']][item['column']] = item
+    layout = {}
+    for page in buttons_seen:
+        n = len(buttons_seen[page])
+        button_height = display_height/(n + margin_ratio*n + margin_ratio)
+        gap = button_height * margin_ratio
+        if not corner_radius:
+            this_page_corner_radius = gap
+        else:
+            this_page_corner_radius = corner_radius
+        for row in buttons_seen[page]:
+            m = len(buttons_seen[page][row])
+            button_width = (display_width - (m+1)*gap)/m
+            for column in buttons_seen[page][row]:
+                layout[(page,row,column)] = (gap*(column+1)+column*button_width,
+                                             gap*(row+1)+row*button_height,
+                                             button_width,
+                                             button_height,
+                                             this_page_corner_radius)
+    return layout
+
+
+@pytest.mark.parametrize('margin_ratio, corner_radius, width, height',
+                         [(0.1, None, 480, 480), (0.25, 8, 480, 480), (0.05, None, 240, 320)])
+def test_layout_buttons_matches_original_layout(margin_ratio, corner_radius, width, height):
+    buttons_defs = read_input_file(BUTTON_DEFS)[0]
+    layout = layout_buttons(buttons_defs, width, height, margin_ratio, corner_radius)
+    expected = inline_layout(buttons_defs, width, height, margin_ratio, corner_radius)
+    assert {address: layout[address][:5] for address in layout} == expected
+
+
+def test_button_set_uses_layout_buttons(buttons):
+    buttons_defs, margin_ratio = read_input_file(BUTTON_DEFS)[:2]
+    layout = layout_buttons(buttons_defs, 480, 480, margin_ratio)
+    for address in layout:
+        button = ButtonSet.get_button_obj(address)
+        assert (button.x, button.y, button.width, button.height, button.radius) == layout[address][:5]
+
+
+class SyntheticImage:
+    def __init__(self, width, height, pixels):
+        self.width = width
+        self.height = height
+        self.pixels = pixels
+
+    def getdata(self):
+        return self.pixels
+
+
+KEY_BYTES = bytes([build_assets.KEY_COLOR >> 8, build_assets.KEY_COLOR & 0xFF])
+
+
+def test_to_raw_pixels_converts_to_big_endian_rgb565_with_key():
+    image = SyntheticImage(4, 1, [(255, 0, 0, 255),
+                                  (0, 0, 0, 0),
+                                  (255, 255, 255, 128),
+                                  (255, 0, 255, 255)])
+    raw = build_assets.to_raw_pixels(image, (0, 0, 0))
+    assert raw[0:2] == bytes([0xF8, 0x00])
+    assert raw[2:4] == KEY_BYTES
+    assert raw[4:6] == bytes([0x84, 0x10])
+    assert raw[6:8] == bytes([0xF8, 0x1E])
+
+
+def test_framebuf_key_matches_little_endian_read_of_key_bytes():
+    assert build_assets.framebuf_key() == KEY_BYTES[0] | (KEY_BYTES[1] << 8)
+
+
+def test_read_asset_manifest_falls_back_on_bad_files(tmp_path):
+    assert read_asset_manifest(str(tmp_path / 'missing.json')) == {}
+    truncated = tmp_path / 'manifest.json'
+    truncated.write_text('{"assets": {"Up.png@141x')
+    assert read_asset_manifest(str(truncated)) == {}
+
+
+@pytest.mark.parametrize('display, background_color, expected',
+                         [((480, 480), 'black', True),
+                          ((480, 480), (0, 0, 0), True),
+                          ((320, 240), 'black', False),
+                          ((480, 480), 'white', False)])
+def test_read_asset_manifest_checks_display_and_background(tmp_path, display, background_color, expected):
+    assets = {'Up.png@141x141': {'file': 'Up_141x141.raw', 'width': 106, 'height': 106, 'key': 8184}}
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'display': [480, 480],
+                                    'background_color': [0, 0, 0],
+                                    'assets': assets}))
+    result = read_asset_manifest(str(manifest), *display, background_color)
+    assert result == (assets if expected else {})
+
+
+SYMBOL_ADDRESS = (1, 0, 0)
+SYMBOL_SIZE = 4, 3
+
+
+@pytest.fixture
+def prepared(tmp_path, monkeypatch, board):
+    """Writes a 4x3 prepared symbol for the first symbol button and a screen frame buffer to blit into"""
+    width, height = SYMBOL_SIZE
+    pixels = [(0, 255, 0, 255) if (row + column) % 2 else (0, 0, 0, 0)
+              for row in range(height) for column in range(width)]
+    raw = build_assets.to_raw_pixels(SyntheticImage(width, height, pixels), (0, 0, 0))
+    (tmp_path / 'symbol.raw').write_bytes(raw)
+
+    buttons_defs, margin_ratio = read_input_file(BUTTON_DEFS)[:2]
+    x, y, button_width, button_height, radius, info = \
+        layout_buttons(buttons_defs, 480, 480, margin_ratio)[SYMBOL_ADDRESS]
+    key = prepared_asset_key(info['symbol'], button_width, button_height)
+    (tmp_path / 'manifest.json').write_text(json.dumps(
+        {'display': [480, 480],
+         'background_color': [0, 0, 0],
+         'assets': {key: {'file': 'symbol.raw',
+                          'width': width,
+                          'height': height,
+                          'key': build_assets.framebuf_key()}}}))
+    monkeypatch.setattr(button_set, 'PREPARED_DIR', str(tmp_path))
+    FunctionButton.screen = StubFrameBuffer(bytearray(480*480*2), 480, 480, 1)
+    return raw
+
+
+def test_prepared_symbol_is_blitted_without_key_pixels(make_buttons, prepared):
+    make_buttons()
+    ButtonSet.jump_to_page(SYMBOL_ADDRESS[0])
+    button = ButtonSet.get_button_obj(SYMBOL_ADDRESS)
+    assert button.symbol_image is not None
+
+    button.redraw_button()
+
+    screen = FunctionButton.screen.buffer
+    width, height = SYMBOL_SIZE
+    for row in range(height):
+        for column in range(width):
+            i = 2*(row*width + column)
+            j = 2*((button.symbol_y+row)*480 + button.symbol_x + column)
+            if prepared[i:i+2] == KEY_BYTES:
+                assert screen[j:j+2] == bytes(2)
+            else:
+                assert screen[j:j+2] == prepared[i:i+2]
+
+
+def test_short_prepared_file_falls_back_to_png(make_buttons, prepared, tmp_path):
+    (tmp_path / 'symbol.raw').write_bytes(prepared[:5])
+    make_buttons()
+    assert ButtonSet.get_button_obj(SYMBOL_ADDRESS).symbol_image is None
+
+
+def test_changing_symbol_path_drops_prepared_symbol(make_buttons, prepared, monkeypatch):
+    opened = []
+    make_buttons()
+    monkeypatch.setattr(FunctionButton.png, 'open_file', opened.append, raising=False)
+    ButtonSet.jump_to_page(SYMBOL_ADDRESS[0])
+    button = ButtonSet.get_button_obj(SYMBOL_ADDRESS)
+    assert button.symbol_image is not None
+
+    button.symbol_path = '/art/Star.png'
+    button.redraw_button()
+    assert button.symbol_image is None
+    assert opened == ['/art/Star.png']
+
+
+class NullScreen:
+    def blit(self, source, x, y, key):
+        pass
+
+
+def test_redraw_prepared_symbol_does_not_allocate(make_buttons, prepared, board):
+    make_buttons()
+    ButtonSet.jump_to_page(SYMBOL_ADDRESS[0])
+    FunctionButton.screen = NullScreen()
+    board.record_updates = False
+    button = ButtonSet.get_button_obj(SYMBOL_ADDRESS)
+    assert button.symbol_image is not None
+    assert bytes_allocated(button.redraw_button, 100) == 0
+
+
+def test_build_assets_output_is_loaded_for_every_symbol_button(tmp_path, monkeypatch, make_buttons):
+    pytest.importorskip('PIL')
+    art_dir = tmp_path / 'art'
+    shutil.copytree(os.path.join(ROOT, 'art'), art_dir)
+    assets = build_assets.build_assets(BUTTON_DEFS, str(art_dir), 480, 480, 0.75)
+    assert assets
+
+    monkeypatch.setattr(button_set, 'PREPARED_DIR', str(art_dir / 'prepared'))
+    FunctionButton.screen = StubFrameBuffer(bytearray(480*480*2), 480, 480, 1)
+    buttons = make_buttons()
+    symbol_buttons = [button for page in buttons.pages.values() for button in page if button.symbol_path]
+    assert symbol_buttons
+    for button in symbol_buttons:
+        assert button.symbol_image is not None, button.symbol
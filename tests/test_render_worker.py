@@ -0,0 +1,163 @@
+"""
+Runs the render worker as a Linux thread against the stub board
+"""
+
+import threading
+import time
+
+import pytest
+
+from button_set import ButtonSet
+from render_worker import RenderWorker
+
+TIMEOUT_MS = 2000
+
+
+def wait_until(condition, timeout_ms=TIMEOUT_MS):
+    """Polls condition until it is true or timeout_ms passes and returns its last value"""
+    for _ in range(timeout_ms):
+        if condition():
+            return True
+        time.sleep(0.001)
+    return condition()
+
+
+@pytest.fixture
+def renderer(buttons):
+    renderer = RenderWorker(capacity=4)
+    ButtonSet.renderer = renderer
+    yield renderer
+    renderer.stop()
+    renderer.fence(timeout_ms=TIMEOUT_MS)
+    wait_until(lambda: not renderer.running)
+    ButtonSet.renderer = None
+
+
+@pytest.fixture
+def blocked_page(buttons, monkeypatch):
+    """Replaces render_page with one that waits on an event so the worker stays busy"""
+    started = threading.Event()
+    release = threading.Event()
+    render_page = buttons.render_page
+
+    def slow_render_page():
+        started.set()
+        release.wait(TIMEOUT_MS/1000)
+        render_page()
+
+    monkeypatch.setattr(buttons, 'render_page', slow_render_page)
+    yield started, release
+    release.set()
+
+
+def partial_update_for(address):
+    button = ButtonSet.get_button_obj(address)
+    return ('partial_update', button.update_x, button.update_y, button.update_width, button.update_height)
+
+
+def test_frames_are_drawn_in_order_across_a_page_change(buttons, board, renderer):
+    renderer.start()
+    ButtonSet.get_button_obj((0, 0, 0)).redraw_button()
+    ButtonSet.get_button_obj((0, 0, 1)).redraw_button()
+    assert renderer.fence(timeout_ms=TIMEOUT_MS)
+
+    ButtonSet.jump_to_page(1)
+    buttons.draw_page()
+    ButtonSet.get_button_obj((1, 1, 0)).redraw_button()
+    ButtonSet.get_button_obj((0, 0, 2)).redraw_button()
+    assert renderer.fence(timeout_ms=TIMEOUT_MS)
+
+    assert board.updates == [partial_update_for((0, 0, 0)),
+                             partial_update_for((0, 0, 1)),
+                             'update',
+                             partial_update_for((1, 1, 0))]
+    assert board.display.calls == ['clear']
+
+
+def test_touch_actions_run_while_a_page_is_drawing(buttons, board, renderer, blocked_page):
+    started, release = blocked_page
+    pressed = ButtonSet.get_button_obj((0, 0, 0))
+    pressed.fn = lambda: 'pressed'
+    pressed.arg = None
+
+    renderer.start()
+    buttons.draw_page()
+    assert started.wait(TIMEOUT_MS/1000)
+
+    board.touch.state = True
+    board.touch.x, board.touch.y = pressed.x + 1, pressed.y + 1
+    assert buttons.touch_to_action() == 'pressed'
+    assert board.updates == []
+
+    release.set()
+    assert renderer.fence(timeout_ms=TIMEOUT_MS)
+    assert board.updates == ['update']
+
+
+def test_queued_redraws_of_one_button_are_merged(buttons, board, renderer, blocked_page):
+    started, release = blocked_page
+    renderer.start()
+    buttons.draw_page()
+    assert started.wait(TIMEOUT_MS/1000)
+
+    ButtonSet.get_button_obj((0, 0, 0)).redraw_button()
+    ButtonSet.get_button_obj((0, 0, 0)).redraw_button()
+    ButtonSet.get_button_obj((0, 0, 1)).redraw_button()
+    assert renderer.frames_submitted == 3
+
+    release.set()
+    assert renderer.fence(timeout_ms=TIMEOUT_MS)
+    assert board.updates == ['update',
+                             partial_update_for((0, 0, 0)),
+                             partial_update_for((0, 0, 1))]
+
+
+def test_full_queue_makes_submit_wait(buttons, board, renderer, blocked_page):
+    started, release = blocked_page
+    renderer.start()
+    buttons.draw_page()
+    assert started.wait(TIMEOUT_MS/1000)
+    ButtonSet.get_button_obj((0, 0, 0)).redraw_button()
+    ButtonSet.get_button_obj((0, 0, 1)).redraw_button()
+
+    waiting = threading.Thread(target=ButtonSet.get_button_obj((0, 0, 2)).redraw_button)
+    waiting.start()
+    waiting.join(0.05)
+    assert waiting.is_alive()
+    assert renderer.frames_submitted == 3
+
+    release.set()
+    waiting.join(TIMEOUT_MS/1000)
+    assert not waiting.is_alive()
+    assert renderer.fence(timeout_ms=TIMEOUT_MS)
+    assert board.updates == ['update',
+                             partial_update_for((0, 0, 0)),
+                             partial_update_for((0, 0, 1)),
+                             partial_update_for((0, 0, 2))]
+
+
+def test_submit_draws_inline_when_worker_is_not_running(board, renderer):
+    ButtonSet.get_button_obj((0, 0, 0)).redraw_button()
+    assert board.updates == [partial_update_for((0, 0, 0))]
+    assert renderer.fence(timeout_ms=0)
+
+
+class ExplodingTargets(list):
+    """Raises when the worker clears a slot, killing the worker thread outside its draw error handling"""
+
+    def __setitem__(self, index, value):
+        if value is None:
+            raise RuntimeError('worker thread died')
+        super().__setitem__(index, value)
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnraisableExceptionWarning')
+def test_dead_worker_is_detected_and_drawing_falls_back_inline(board, renderer):
+    renderer.targets = ExplodingTargets(renderer.targets)
+    renderer.start()
+    ButtonSet.get_button_obj((0, 0, 0)).redraw_button()
+    assert wait_until(lambda: not renderer.running)
+    assert not renderer.fence(timeout_ms=TIMEOUT_MS)
+
+    ButtonSet.get_button_obj((0, 0, 1)).redraw_button()
+    assert board.updates == [partial_update_for((0, 0, 1))]
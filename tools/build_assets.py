@@ -0,0 +1,132 @@
+"""
+build_assets.py 2026-10-19 v 1.0
+
+Offline build step that pre-scales button symbols to raw display pixels
+
+Run on a computer, not the Presto:
+    python tools/build_assets.py [button_defs.json] [--width 480] [--height 480]
+
+Reads the button definitions, works out the size of every button with the same
+layout rules as ButtonSet, and writes each symbol scaled to fit its button into
+art/prepared/ as big endian RGB565 pixels, along with a manifest.json.
+Transparent pixels are set to a key color that no opaque pixel uses, so the
+Presto can draw the symbol with a single framebuf blit that skips the key.
+Copy art/prepared/ onto the Presto with the rest of the art directory.
+Buttons without a prepared symbol fall back to decoding the png at runtime.
+
+Requires Pillow.
+
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from utils import color_converter, layout_buttons, prepared_asset_key, read_input_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ALPHA_THRESHOLD = 8
+KEY_COLOR = 0xF81F
+
+
+def scale_symbol(image, button_width, button_height, fill):
+    """Scales image to fit inside fill times the button size while keeping its aspect ratio"""
+    scale = min(fill*button_width/image.width, fill*button_height/image.height)
+    width = max(1, round(image.width*scale))
+    height = max(1, round(image.height*scale))
+    return image.resize((width, height), Image.LANCZOS)
+
+def to_raw_pixels(image, background):
+    """
+    Converts an RGBA image to big endian RGB565 pixels with transparent pixels set to KEY_COLOR.
+    Partly transparent pixels are blended with the background color so edges stay smooth
+    on the page background. Opaque pixels that happen to match KEY_COLOR have their lowest
+    blue bit flipped so they are not skipped.
+    """
+    bg_r, bg_g, bg_b = background
+    pixels = bytearray()
+    for r, g, b, a in image.getdata():
+        if a < ALPHA_THRESHOLD:
+            value = KEY_COLOR
+        else:
+            r = (r*a + bg_r*(255-a))//255
+            g = (g*a + bg_g*(255-a))//255
+            b = (b*a + bg_b*(255-a))//255
+            value = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+            if value == KEY_COLOR:
+                value ^= 0x0001
+        pixels.append(value >> 8)
+        pixels.append(value & 0xFF)
+    return bytes(pixels)
+
+def framebuf_key():
+    """Returns KEY_COLOR as framebuf reads it, a little endian 16 bit word of the big endian bytes"""
+    return ((KEY_COLOR & 0xFF) << 8) | (KEY_COLOR >> 8)
+
+def build_assets(json_file, art_dir, display_width, display_height, fill):
+    """Writes a prepared raw pixel file for every symbol and button size used in json_file"""
+    buttons_defs, margin_ratio, default_color, background_color, \
+        default_font, corner_radius, other_vars = read_input_file(json_file)
+    background = color_converter(background_color or 'black')
+    layout = layout_buttons(buttons_defs,
+                            display_width,
+                            display_height,
+                            margin_ratio,
+                            corner_radius)
+
+    out_dir = os.path.join(art_dir, 'prepared')
+    os.makedirs(out_dir, exist_ok=True)
+    assets = {}
+    for address in layout:
+        x, y, button_width, button_height, radius, info = layout[address]
+        symbol = info.get('symbol')
+        if not symbol:
+            continue
+        key = prepared_asset_key(symbol, button_width, button_height)
+        if key in assets:
+            continue
+        try:
+            image = Image.open(os.path.join(art_dir, symbol)).convert('RGBA')
+        except OSError as exc:
+            print(f'No image file called {symbol} found for button {info.get("name")}.')
+            print(exc)
+            continue
+        image = scale_symbol(image, button_width, button_height, fill)
+        file_name = f'{os.path.splitext(symbol)[0]}_{round(button_width)}x{round(button_height)}.raw'
+        with open(os.path.join(out_dir, file_name), 'wb') as file:
+            file.write(to_raw_pixels(image, background))
+        assets[key] = {'file': file_name,
+                       'width': image.width,
+                       'height': image.height,
+                       'key': framebuf_key()}
+        print(f'{key} -> {file_name} ({image.width}x{image.height})')
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as file:
+        json.dump({'format': 'RGB565 big endian, transparent pixels set to key',
+                   'display': [display_width, display_height],
+                   'background_color': list(background),
+                   'assets': assets}, file, indent=2)
+    return assets
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-scale button symbols to raw RGB565 pixels for the Presto')
+    parser.add_argument('json_file', nargs='?', default='button_defs.json')
+    parser.add_argument('--art', default='art', help='directory holding the symbol png files')
+    parser.add_argument('--width', type=int, default=480, help='display width in pixels')
+    parser.add_argument('--height', type=int, default=480, help='display height in pixels')
+    parser.add_argument('--fill', type=float, default=0.75,
+                        help='fraction of the button width and height the symbol is scaled to fill')
+    args = parser.parse_args()
+    if Image is None:
+        sys.exit('build_assets.py needs Pillow. Install it with: pip install Pillow')
+    build_assets(args.json_file, args.art, args.width, args.height, args.fill)
+
+if __name__ == '__main__':
+    main()